@@ -3,16 +3,21 @@
 Ranges here are ripped from public sites.
 """
 
-from typing import List, Tuple, Optional, Dict
+from typing import Sequence, Tuple, Optional, Dict
 from enum import Enum
+from bisect import bisect_left, bisect_right
 import dataclasses
 
 
 class Pollutant(Enum):
-    """Enum of possible pollutans."""
+    """Enum of possible pollutans.
 
-    PM_25 = 0
-    PM_10 = 1
+    Values are the names stored in the database and shown in the API, so no separate
+    translation table is needed.
+    """
+
+    PM_25 = "PM25"
+    PM_10 = "PM10"
 
 
 class EpaLevels(Enum):
@@ -26,15 +31,16 @@ class EpaLevels(Enum):
     HAZARDOUS = 5
 
 
-AQI: List[Tuple[int, int]] = [
+AQI: Tuple[Tuple[int, int], ...] = (
     (0, 50),
     (51, 100),
     (101, 150),
     (151, 200),
     (201, 300),
-    (301, 500),
-]
-PM_25: List[Tuple[float, float]] = [
+    (301, 400),
+    (401, 500),
+)
+PM_25: Tuple[Tuple[float, float], ...] = (
     (0.0, 12.0),
     (12.1, 35.4),
     (35.5, 55.4),
@@ -42,9 +48,9 @@ PM_25: List[Tuple[float, float]] = [
     (150.5, 250.4),
     (250.5, 350.4),
     (350.5, 500.4),
-]
+)
 
-PM_10: List[Tuple[float, float]] = [
+PM_10: Tuple[Tuple[float, float], ...] = (
     (0, 54),
     (55, 154),
     (155, 254),
@@ -52,15 +58,48 @@ PM_10: List[Tuple[float, float]] = [
     (355, 424),
     (425, 504),
     (505, 604),
-]
+)
+
+AQI_LOOKUP_MAP: Dict[Pollutant, Tuple[Tuple[float, float], ...]] = {Pollutant.PM_25: PM_25, Pollutant.PM_10: PM_10}
+
+# Flat arrays of range lower bounds, so ranges can be located with a single binary search rather than
+# a linear scan on every reading.
+_LOWER_BOUNDS: Dict[Pollutant, Tuple[float, ...]] = {
+    pollutant: tuple(pm_range[0] for pm_range in ranges) for pollutant, ranges in AQI_LOOKUP_MAP.items()
+}
 
-AQI_LOOKUP_MAP: Dict[Pollutant, List[Tuple[float, float]]] = {Pollutant.PM_25: PM_25, Pollutant.PM_10: PM_10}
+# Flat array of AQI range upper bounds, used to find the EPA level for a reading.
+_AQI_UPPER_BOUNDS: Tuple[int, ...] = tuple(pair[1] for pair in AQI)
+
+# Levels by index, so lookups skip the (comparatively slow) EpaLevels(i) enum call.  The top
+# two AQI ranges both map to HAZARDOUS.
+_LEVELS: Tuple[EpaLevels, ...] = tuple(EpaLevels) + (EpaLevels.HAZARDOUS,)
+
+
+def _precompute_segments(ranges: Tuple[Tuple[float, float], ...]) -> Tuple[Tuple[float, float], ...]:
+    """Precompute (slope, intercept) for each PM range of the piecewise AQI formula.
+
+    The breakpoints are constants, so the division can be done once at module load and the
+    per-reading work becomes a single multiply-add.
+    """
+    segments = []
+    for (pm_low, pm_high), (aqi_low, aqi_high) in zip(ranges, AQI):
+        slope = (aqi_high - aqi_low) / (pm_high - pm_low)
+        segments.append((slope, aqi_low - slope * pm_low))
+    return tuple(segments)
+
+
+_SEGMENTS: Dict[Pollutant, Tuple[Tuple[float, float], ...]] = {
+    pollutant: _precompute_segments(ranges) for pollutant, ranges in AQI_LOOKUP_MAP.items()
+}
 
 
 @dataclasses.dataclass(frozen=True)
 class PollutantReading:
     """A reading for a given pollutant."""
 
+    __slots__ = ("reading", "pollutant")
+
     reading: float
     pollutant: Pollutant
 
@@ -69,40 +108,38 @@ class PollutantReading:
 class EpaAqi:
     """An EPA AQI value, with the pollutant responsible for the value."""
 
+    __slots__ = ("reading", "responsible_pollutant")
+
     reading: float
     responsible_pollutant: Pollutant
 
 
 def get_epa_level(epa_reading: float) -> EpaLevels:
     """Get the EPA level from a PM25 reading."""
-    for i, pair in enumerate(AQI):
-        if pair[0] <= epa_reading <= pair[1]:
-            return EpaLevels(i)
-    raise ValueError("Invalid PM value")
+    idx = bisect_left(_AQI_UPPER_BOUNDS, epa_reading)
+    if epa_reading < 0 or idx >= len(_AQI_UPPER_BOUNDS):
+        raise ValueError("Invalid PM value")
+    return _LEVELS[idx]
 
 
-def calculate_epa_aqi(readings: List[PollutantReading]) -> Optional[EpaAqi]:
+def calculate_epa_aqi(readings: Sequence[PollutantReading]) -> Optional[EpaAqi]:
     """Calculate the EPA AQI from a list of pollutant readings.
 
     The worst possible value will be reported.
     """
-    max_value: Optional[EpaAqi] = None
-    for reading in readings:
-        epa_value = calculate_epa_aqi_raw(reading)
-        if max_value is None or max_value.reading < epa_value:
-            max_value = EpaAqi(epa_value, reading.pollutant)
-    return max_value
+    if not readings:
+        return None
+    values = [calculate_epa_aqi_raw(reading) for reading in readings]
+    worst = values.index(max(values))
+    return EpaAqi(values[worst], readings[worst].pollutant)
 
 
 def calculate_epa_aqi_raw(pollutant_reading: PollutantReading) -> int:
     """Calculate the EPA AQI based on a pollutant reading."""
     ranges = AQI_LOOKUP_MAP[pollutant_reading.pollutant]
-    for i, pm_range in enumerate(ranges):
-        if pm_range[0] <= pollutant_reading.reading <= pm_range[1]:
-            aqi_low = AQI[i][0]
-            aqi_high = AQI[i][1]
-            pm_low = pm_range[0]
-            pm_high = pm_range[1]
-            epa = ((aqi_high - aqi_low) / (pm_high - pm_low)) * (pollutant_reading.reading - pm_low) + aqi_low
-            return round(epa)
-    return -1
+    reading = pollutant_reading.reading
+    i = bisect_right(_LOWER_BOUNDS[pollutant_reading.pollutant], reading) - 1
+    if i < 0 or i >= len(AQI) or reading > ranges[i][1]:
+        return -1
+    slope, intercept = _SEGMENTS[pollutant_reading.pollutant][i]
+    return round(slope * reading + intercept)
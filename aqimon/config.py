@@ -1,6 +1,7 @@
 """Config module."""
 import os.path
 from dataclasses import dataclass
+from functools import lru_cache
 
 DEFAULT_DB_PATH = "~/.aqimon/db.sqlite"
 
@@ -46,8 +47,13 @@ DEFAULT_CONFIG = Config(
 )
 
 
+@lru_cache(maxsize=1)
 def get_config_from_env() -> Config:
-    """Get the config from environment variables."""
+    """Get the config from environment variables.
+
+    Config is immutable for the process lifetime, so the parsed result is cached; repeated
+    callers don't re-read the environment.
+    """
     return Config(
         database_path=os.path.expanduser(os.environ.get("AQIMON_DB_PATH", DEFAULT_CONFIG.database_path)),
         poll_frequency_sec=int(os.environ.get("AQIMON_POLL_FREQUENCY_SEC", DEFAULT_CONFIG.poll_frequency_sec)),
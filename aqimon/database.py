@@ -1,6 +1,7 @@
 """Database operations."""
-from datetime import datetime, timedelta
-from typing import Optional, List
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, List, Tuple
 import databases
 from dataclasses import dataclass
 
@@ -12,6 +13,8 @@ class AveragedRead:
     Includes the number of reads that went into the average, as well as the oldest timestamp of those reads.
     """
 
+    __slots__ = ("avg_pm25", "avg_pm10", "count", "oldest_read_time")
+
     avg_pm25: float
     avg_pm10: float
     count: int
@@ -22,6 +25,8 @@ class AveragedRead:
 class ReadLogEntry:
     """A read log entry."""
 
+    __slots__ = ("event_time", "pm25", "pm10")
+
     event_time: datetime
     pm25: float
     pm10: float
@@ -31,6 +36,8 @@ class ReadLogEntry:
 class EpaAqiLogEntry:
     """An EPA Aqi log entry."""
 
+    __slots__ = ("event_time", "epa_aqi", "pollutant", "read_count", "oldest_read_time")
+
     event_time: datetime
     epa_aqi: float
     pollutant: str
@@ -38,6 +45,65 @@ class EpaAqiLogEntry:
     oldest_read_time: datetime
 
 
+# All SQL text is assembled once at import; the functions below only bind parameters.
+_INSERT_READ_SQL = "INSERT OR REPLACE INTO read_log VALUES (:formatted_time, :pm25, :pm10)"
+_INSERT_EPA_SQL = (
+    "INSERT OR REPLACE INTO epa_aqi_log VALUES (:formatted_time, :epa_aqi, :pollutant, :read_count, :oldest_read_time)"
+)
+
+_ALL_READS_SQL = "SELECT event_time, pm10, pm25 FROM read_log ORDER BY event_time ASC"
+_ALL_READS_WINDOW_SQL = (
+    "SELECT event_time, pm10, pm25 FROM read_log WHERE event_time >= :lookback ORDER BY event_time ASC"
+)
+_ALL_EPA_SQL = (
+    "SELECT event_time, epa_aqi, pollutant, read_count, oldest_read_time FROM epa_aqi_log ORDER BY event_time ASC"
+)
+_ALL_EPA_WINDOW_SQL = (
+    "SELECT event_time, epa_aqi, pollutant, read_count, oldest_read_time "
+    "FROM epa_aqi_log "
+    "WHERE event_time >= :lookback ORDER BY event_time ASC"
+)
+
+_BUCKETED_READS_SELECT = (
+    "SELECT (event_time / :bucket) * :bucket AS bucket_time, ROUND(AVG(pm25), 2), ROUND(AVG(pm10), 2) FROM read_log "
+)
+_BUCKETED_EPA_SELECT = (
+    "SELECT (event_time / :bucket) * :bucket AS bucket_time, "
+    "ROUND(AVG(epa_aqi), 2), pollutant, SUM(read_count), MIN(oldest_read_time) "
+    "FROM epa_aqi_log "
+)
+_RAW_READ_POINTS_SELECT = "SELECT event_time, pm25, pm10 FROM read_log "
+_RAW_EPA_POINTS_SELECT = "SELECT event_time, epa_aqi FROM epa_aqi_log "
+_BUCKETED_EPA_POINTS_SELECT = (
+    "SELECT (event_time / :bucket) * :bucket AS bucket_time, ROUND(AVG(epa_aqi), 2) FROM epa_aqi_log "
+)
+
+
+def _build_point_queries(raw_select: str, bucket_select: str) -> Dict[Tuple[bool, bool], str]:
+    """Precompute the four (bucketed, windowed) variants of a point query at import time."""
+    queries = {}
+    for bucketed in (False, True):
+        for windowed in (False, True):
+            sql = bucket_select if bucketed else raw_select
+            if windowed:
+                sql += "WHERE event_time >= :lookback "
+            if bucketed:
+                sql += "GROUP BY bucket_time ORDER BY bucket_time ASC"
+            else:
+                sql += "ORDER BY event_time ASC"
+            queries[(bucketed, windowed)] = sql
+    return queries
+
+
+_READ_POINT_QUERIES = _build_point_queries(_RAW_READ_POINTS_SELECT, _BUCKETED_READS_SELECT)
+_EPA_POINT_QUERIES = _build_point_queries(_RAW_EPA_POINTS_SELECT, _BUCKETED_EPA_POINTS_SELECT)
+
+_BUCKETED_EPA_SQL = _BUCKETED_EPA_SELECT + "GROUP BY bucket_time ORDER BY bucket_time ASC"
+_BUCKETED_EPA_WINDOW_SQL = (
+    _BUCKETED_EPA_SELECT + "WHERE event_time >= :lookback GROUP BY bucket_time ORDER BY bucket_time ASC"
+)
+
+
 async def get_latest_read(dbconn: databases.Database) -> ReadLogEntry:
     """Get the most recent read from the database."""
     result = await dbconn.fetch_one("SELECT event_time, pm25, pm10 FROM read_log ORDER BY event_time DESC LIMIT 1")
@@ -47,6 +113,18 @@ async def get_latest_read(dbconn: databases.Database) -> ReadLogEntry:
         return ReadLogEntry(datetime.now(), 0, 0)
 
 
+async def get_latest_event_time(dbconn: databases.Database) -> Optional[int]:
+    """Get the epoch timestamp of the most recent read, or None if the log is empty.
+
+    This is a single b-tree descent on the primary key, so it's cheap enough to run per
+    request as a cache-freshness check.
+    """
+    result = await dbconn.fetch_one("SELECT MAX(event_time) FROM read_log")
+    if result is None or result[0] is None:
+        return None
+    return result[0]
+
+
 async def get_latest_epa_aqi(dbconn: databases.Database) -> EpaAqiLogEntry:
     """Get the most recent EPA AQI from the database."""
     result = await dbconn.fetch_one(
@@ -67,20 +145,58 @@ async def get_latest_epa_aqi(dbconn: databases.Database) -> EpaAqiLogEntry:
         )
 
 
+def iter_all_reads(dbconn: databases.Database, lookback: Optional[datetime]) -> AsyncIterator[ReadLogEntry]:
+    """Iterate read stats for a given time window, streaming rows from the cursor.
+
+    Unlike get_all_reads, this never materializes the full result list, so peak memory stays
+    constant no matter how large the window is.  If no window is specified, all results are
+    yielded.
+    """
+    if lookback:
+        rows = dbconn.iterate(_ALL_READS_WINDOW_SQL, values={"lookback": int(lookback.timestamp())})
+    else:
+        rows = dbconn.iterate(_ALL_READS_SQL)
+
+    async def generate() -> AsyncIterator[ReadLogEntry]:
+        from_timestamp = datetime.fromtimestamp
+        async for x in rows:
+            yield ReadLogEntry(event_time=from_timestamp(x[0]), pm10=x[1], pm25=x[2])
+
+    return generate()
+
+
 async def get_all_reads(dbconn: databases.Database, lookback: Optional[datetime]) -> List[ReadLogEntry]:
     """Retrieve all read stats, for a given time window.
 
     If no window is specified, all results are returned.
     """
+    return [read async for read in iter_all_reads(dbconn, lookback)]
+
+
+def iter_all_epa_aqis(dbconn: databases.Database, lookback: Optional[datetime]) -> AsyncIterator[EpaAqiLogEntry]:
+    """Iterate EPA AQI stats for a given time window, streaming rows from the cursor.
+
+    Unlike get_all_epa_aqis, this never materializes the full result list, so peak memory
+    stays constant no matter how large the window is.  If no window is specified, all
+    results are yielded.
+    """
     if lookback:
-        data = await dbconn.fetch_all(
-            "SELECT event_time, pm10, pm25 FROM read_log WHERE event_time >= :lookback ORDER BY event_time ASC",
-            values={"lookback": int(lookback.timestamp())},
-        )
+        rows = dbconn.iterate(_ALL_EPA_WINDOW_SQL, values={"lookback": int(lookback.timestamp())})
     else:
-        data = await dbconn.fetch_all("SELECT event_time, pm10, pm25 FROM read_log ORDER BY event_time ASC")
+        rows = dbconn.iterate(_ALL_EPA_SQL)
+
+    async def generate() -> AsyncIterator[EpaAqiLogEntry]:
+        from_timestamp = datetime.fromtimestamp
+        async for x in rows:
+            yield EpaAqiLogEntry(
+                event_time=from_timestamp(x[0]),
+                epa_aqi=x[1],
+                pollutant=x[2],
+                read_count=x[3],
+                oldest_read_time=from_timestamp(x[4]),
+            )
 
-    return [ReadLogEntry(event_time=datetime.fromtimestamp(x[0]), pm10=x[1], pm25=x[2]) for x in data]
+    return generate()
 
 
 async def get_all_epa_aqis(dbconn: databases.Database, lookback: Optional[datetime]) -> List[EpaAqiLogEntry]:
@@ -88,31 +204,96 @@ async def get_all_epa_aqis(dbconn: databases.Database, lookback: Optional[dateti
 
     If no window is specified, all results are returned.
     """
+    return [read async for read in iter_all_epa_aqis(dbconn, lookback)]
+
+
+async def get_bucketed_reads(
+    dbconn: databases.Database, lookback: Optional[datetime], bucket_seconds: int
+) -> List[ReadLogEntry]:
+    """Retrieve reads averaged into fixed-width time buckets, for a given time window.
+
+    Long windows hold far more rows than a chart can usefully display, so the rows are
+    collapsed in SQL before they cross into Python.  Each bucket is reported at its start
+    time.  If no window is specified, all results are bucketed.
+    """
+    values = {"bucket": bucket_seconds}
     if lookback:
-        data = await dbconn.fetch_all(
-            "SELECT event_time, epa_aqi, pollutant, read_count, oldest_read_time "
-            "FROM epa_aqi_log "
-            "WHERE event_time >= :lookback ORDER BY event_time ASC",
-            values={"lookback": int(lookback.timestamp())},
-        )
-    else:
-        data = await dbconn.fetch_all(
-            "SELECT event_time, epa_aqi, pollutant, read_count, oldest_read_time "
-            "FROM epa_aqi_log ORDER BY event_time ASC"
-        )
+        values["lookback"] = int(lookback.timestamp())
+    query = _READ_POINT_QUERIES[(True, bool(lookback))]
+
+    rows = await dbconn.fetch_all(query, values=values)
+    from_timestamp = datetime.fromtimestamp
+    return [ReadLogEntry(event_time=from_timestamp(x[0]), pm25=x[1], pm10=x[2]) for x in rows]
+
+
+async def get_bucketed_epa_aqis(
+    dbconn: databases.Database, lookback: Optional[datetime], bucket_seconds: int
+) -> List[EpaAqiLogEntry]:
+    """Retrieve EPA AQIs averaged into fixed-width time buckets, for a given time window.
+
+    Each bucket is reported at its start time, with read_count summed across the bucket and
+    the pollutant taken from one of its rows.  If no window is specified, all results are
+    bucketed.
+    """
+    values = {"bucket": bucket_seconds}
+    if lookback:
+        values["lookback"] = int(lookback.timestamp())
+    query = _BUCKETED_EPA_WINDOW_SQL if lookback else _BUCKETED_EPA_SQL
 
+    rows = await dbconn.fetch_all(query, values=values)
+    from_timestamp = datetime.fromtimestamp
     return [
         EpaAqiLogEntry(
-            event_time=datetime.fromtimestamp(x[0]),
+            event_time=from_timestamp(x[0]),
             epa_aqi=x[1],
             pollutant=x[2],
             read_count=x[3],
-            oldest_read_time=datetime.fromtimestamp(x[4]),
+            oldest_read_time=from_timestamp(x[4]),
         )
-        for x in data
+        for x in rows
     ]
 
 
+async def get_read_points(
+    dbconn: databases.Database, lookback: Optional[datetime], bucket_seconds: Optional[int]
+) -> List[dict]:
+    """Retrieve chart-ready read points for a given time window.
+
+    Points keep their stored epoch timestamps, so no datetime objects are constructed just
+    to be converted straight back for the view.  If bucket_seconds is given, rows are
+    averaged into fixed-width buckets reported at their start time.
+    """
+    values: dict = {}
+    if bucket_seconds:
+        values["bucket"] = bucket_seconds
+    if lookback:
+        values["lookback"] = int(lookback.timestamp())
+    query = _READ_POINT_QUERIES[(bool(bucket_seconds), bool(lookback))]
+
+    rows = await dbconn.fetch_all(query, values=values)
+    return [{"t": x[0], "pm25": x[1], "pm10": x[2]} for x in rows]
+
+
+async def get_epa_points(
+    dbconn: databases.Database, lookback: Optional[datetime], bucket_seconds: Optional[int]
+) -> List[dict]:
+    """Retrieve chart-ready EPA AQI points for a given time window.
+
+    Points keep their stored epoch timestamps, so no datetime objects are constructed just
+    to be converted straight back for the view.  If bucket_seconds is given, rows are
+    averaged into fixed-width buckets reported at their start time.
+    """
+    values: dict = {}
+    if bucket_seconds:
+        values["bucket"] = bucket_seconds
+    if lookback:
+        values["lookback"] = int(lookback.timestamp())
+    query = _EPA_POINT_QUERIES[(bool(bucket_seconds), bool(lookback))]
+
+    rows = await dbconn.fetch_all(query, values=values)
+    return [{"t": x[0], "epa": x[1]} for x in rows]
+
+
 async def get_averaged_reads(dbconn: databases.Database, lookback_to: datetime) -> Optional[AveragedRead]:
     """Get the average read values, looking back to a certain time.
 
@@ -147,16 +328,15 @@ async def clean_old(dbconn: databases.Database, retention_minutes: int) -> None:
 
     This is used to keep the database from going infinitely, and allows us to define a retention period.
     """
-    last_week = datetime.now() - timedelta(minutes=retention_minutes)
-    last_week_timestamp = int(last_week.timestamp())
+    cutoff_timestamp = int(time.time()) - retention_minutes * 60
     await dbconn.execute(
-        "DELETE FROM read_log WHERE event_time < :last_week_timestamp",
-        values={"last_week_timestamp": last_week_timestamp},
+        "DELETE FROM read_log WHERE event_time < :cutoff_timestamp",
+        values={"cutoff_timestamp": cutoff_timestamp},
     )
 
     await dbconn.execute(
-        "DELETE FROM epa_aqi_log WHERE event_time < :last_week_timestamp",
-        values={"last_week_timestamp": last_week_timestamp},
+        "DELETE FROM epa_aqi_log WHERE event_time < :cutoff_timestamp",
+        values={"cutoff_timestamp": cutoff_timestamp},
     )
 
 
@@ -168,11 +348,14 @@ async def add_epa_read(
     read_count: int,
     oldest_read_time: datetime,
 ):
-    """Add an EPA read entry to the database."""
+    """Add an EPA read entry to the database.
+
+    event_time is the primary key, so a second entry within the same second replaces the first.
+    """
     formatted_time = int(event_time.timestamp())
     formatted_oldest_read_time = int(oldest_read_time.timestamp())
     await dbconn.execute(
-        query="INSERT INTO epa_aqi_log VALUES (:formatted_time, :epa_aqi, :pollutant, :read_count, :oldest_read_time)",
+        query=_INSERT_EPA_SQL,
         values={
             "formatted_time": formatted_time,
             "epa_aqi": epa_aqi,
@@ -183,11 +366,52 @@ async def add_epa_read(
     )
 
 
+async def add_reads(dbconn: databases.Database, reads: List[ReadLogEntry]):
+    """Add a batch of raw read entries to the database.
+
+    Issues a single executemany inside one transaction, so bulk writes don't pay a
+    statement-compile and commit per row.
+    """
+    async with dbconn.transaction():
+        await dbconn.execute_many(
+            query=_INSERT_READ_SQL,
+            values=[
+                {"formatted_time": int(read.event_time.timestamp()), "pm25": read.pm25, "pm10": read.pm10}
+                for read in reads
+            ],
+        )
+
+
+async def add_epa_reads(dbconn: databases.Database, reads: List[EpaAqiLogEntry]):
+    """Add a batch of EPA read entries to the database.
+
+    Issues a single executemany inside one transaction, so bulk writes don't pay a
+    statement-compile and commit per row.
+    """
+    async with dbconn.transaction():
+        await dbconn.execute_many(
+            query=_INSERT_EPA_SQL,
+            values=[
+                {
+                    "formatted_time": int(read.event_time.timestamp()),
+                    "epa_aqi": read.epa_aqi,
+                    "pollutant": read.pollutant,
+                    "read_count": read.read_count,
+                    "oldest_read_time": int(read.oldest_read_time.timestamp()),
+                }
+                for read in reads
+            ],
+        )
+
+
 async def add_read(dbconn: databases.Database, event_time: datetime, pm25: float, pm10: float):
-    """Add a raw read entry to the database."""
+    """Add a raw read entry to the database.
+
+    event_time is the primary key, so a second entry within the same second replaces the first.
+    """
     formatted_time = int(event_time.timestamp())
     await dbconn.execute(
-        query="INSERT INTO read_log VALUES (:formatted_time, :pm25, :pm10)",
+        query=_INSERT_READ_SQL,
         values={
             "formatted_time": formatted_time,
             "pm25": pm25,
@@ -196,12 +420,42 @@ async def add_read(dbconn: databases.Database, event_time: datetime, pm25: float
     )
 
 
+_READ_LOG_SCHEMA = "(event_time integer PRIMARY KEY, pm25 real, pm10 real) WITHOUT ROWID"
+_EPA_LOG_SCHEMA = (
+    "(event_time integer PRIMARY KEY, epa_aqi real, pollutant text, read_count integer, oldest_read_time integer) "
+    "WITHOUT ROWID"
+)
+
+
+async def _ensure_keyed_table(dbconn: databases.Database, table: str, schema: str) -> None:
+    """Create a log table, migrating legacy databases where event_time wasn't the primary key.
+
+    CREATE TABLE IF NOT EXISTS leaves a pre-existing table untouched, so databases created
+    before the WITHOUT ROWID schema are rebuilt with create-copy-rename.  INSERT OR REPLACE
+    during the copy collapses any duplicate event_time rows the old schema allowed, keeping
+    the most recently inserted one.
+    """
+    await dbconn.execute(f"CREATE TABLE IF NOT EXISTS {table} {schema}")
+    columns = await dbconn.fetch_all(f"PRAGMA table_info({table})")
+    if any(column[1] == "event_time" and column[5] for column in columns):
+        return
+    await dbconn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    await dbconn.execute(f"CREATE TABLE {table} {schema}")
+    await dbconn.execute(f"INSERT OR REPLACE INTO {table} SELECT * FROM {table}_legacy ORDER BY rowid")
+    await dbconn.execute(f"DROP TABLE {table}_legacy")
+
+
 async def create_tables(dbconn: databases.Database):
-    """Create database tables, if they don't already exist."""
-    await dbconn.execute("""CREATE TABLE IF NOT EXISTS read_log (event_time integer, pm25 real, pm10 real)""")
-    await dbconn.execute("""CREATE INDEX IF NOT EXISTS read_eventtime ON read_log (event_time)""")
-    await dbconn.execute(
-        """CREATE TABLE IF NOT EXISTS epa_aqi_log 
-        (event_time integer, epa_aqi real, pollutant text, read_count integer, oldest_read_time integer)"""
-    )
-    await dbconn.execute("""CREATE INDEX IF NOT EXISTS eqpaqi_eventtime ON epa_aqi_log (event_time)""")
+    """Create database tables, if they don't already exist.
+
+    Both logs are clustered b-trees keyed directly on event_time (WITHOUT ROWID), so range
+    scans walk adjacent pages and inserts maintain a single tree; no secondary index is
+    needed.  Tables from databases that predate this schema are migrated in place, and the
+    old secondary index names are dropped so upgraded databases don't carry them.
+    """
+    await _ensure_keyed_table(dbconn, "read_log", _READ_LOG_SCHEMA)
+    await dbconn.execute("""DROP INDEX IF EXISTS read_eventtime""")
+    await dbconn.execute("""DROP INDEX IF EXISTS read_eventtime_covering""")
+    await _ensure_keyed_table(dbconn, "epa_aqi_log", _EPA_LOG_SCHEMA)
+    await dbconn.execute("""DROP INDEX IF EXISTS eqpaqi_eventtime""")
+    await dbconn.execute("""DROP INDEX IF EXISTS epaaqi_eventtime_covering""")
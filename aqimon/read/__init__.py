@@ -20,6 +20,8 @@ class ReaderState:
     Used to report status and errors to the user.
     """
 
+    __slots__ = ("status", "last_exception")
+
     status: ReaderStatus
     last_exception: Optional[Exception]
 
@@ -28,6 +30,8 @@ class ReaderState:
 class AqiRead:
     """A raw read from an AQI device."""
 
+    __slots__ = ("pmtwofive", "pmten")
+
     pmtwofive: float
     pmten: float
 
@@ -11,12 +11,19 @@ from aqimon.read import AqiRead, ReaderState, ReaderStatus
 class MockReader:
     """Mock reader class."""
 
+    # Non-error states carry no per-read data, so share one frozen instance of each instead
+    # of allocating new ones on every read.
+    _IDLE_STATE = ReaderState(ReaderStatus.IDLE, None)
+    _WARM_UP_STATE = ReaderState(ReaderStatus.WARM_UP, None)
+    _READING_STATE = ReaderState(ReaderStatus.READING, None)
+
     def __init__(self, fake_sleep_secs=5, raise_error_odds=50, warm_up_secs=5):
         """Create a mock reader."""
-        self.state = ReaderState(ReaderStatus.IDLE, None)
+        self.state = MockReader._IDLE_STATE
         self.fake_sleep_secs = fake_sleep_secs
         self.raise_error_odds = raise_error_odds
         self.warm_up_secs = warm_up_secs
+        self._uniform = random.uniform
 
     async def read(self) -> AqiRead:
         """Read from the 'device'.
@@ -26,18 +33,18 @@ class MockReader:
         Also, randomly fails some percentage of the time.
         """
         try:
-            self.state = ReaderState(ReaderStatus.WARM_UP, None)
+            self.state = MockReader._WARM_UP_STATE
             await asyncio.sleep(self.warm_up_secs)
-            self.state = ReaderState(ReaderStatus.READING, None)
+            self.state = MockReader._READING_STATE
             raise_error_roll = random.randint(0, 100)
             if raise_error_roll < self.raise_error_odds:
                 raise Exception("Fake error from the reader.")
-            pm25: float = round(random.uniform(0.0, 500.4), 2)
-            pm10: float = round(random.uniform(0.0, 300.0), 2)
+            pm25: float = round(self._uniform(0.0, 500.4), 2)
+            pm10: float = round(self._uniform(0.0, 300.0), 2)
             result = AqiRead(pmtwofive=pm25, pmten=pm10)
 
             await asyncio.sleep(self.fake_sleep_secs)
-            self.state = ReaderState(ReaderStatus.IDLE, None)
+            self.state = MockReader._IDLE_STATE
             return result
         except Exception as e:
             self.state = ReaderState(ReaderStatus.ERRORING, e)
@@ -8,7 +8,19 @@ from . import AqiRead, ReaderState, ReaderStatus
 import serial
 from typing import Union
 from sds011lib import SDS011QueryReader
-from statistics import mean
+
+
+def _set_low_latency(ser: serial.Serial) -> None:
+    """Ask the USB-serial driver to deliver data immediately instead of coalescing it.
+
+    FTDI adapters default to a 16ms latency timer, which delays every response frame from
+    the sensor; pyserial's low-latency mode drops it to 1ms.  Silently ignored for
+    adapters/platforms that don't support it.
+    """
+    try:
+        ser.set_low_latency_mode(True)
+    except Exception:
+        pass
 
 
 class OpinionatedReader:
@@ -25,6 +37,7 @@ class OpinionatedReader:
         """Create the device."""
         if isinstance(ser_dev, str):
             ser_dev = serial.Serial(ser_dev, timeout=2)
+            _set_low_latency(ser_dev)
 
         self.reader = SDS011QueryReader(ser_dev=ser_dev, send_command_sleep=command_wait_time)
 
@@ -39,25 +52,35 @@ class OpinionatedReader:
         self.state = ReaderState(ReaderStatus.IDLE, None)
 
     async def read(self) -> AqiRead:
-        """Read from the device."""
+        """Read from the device.
+
+        The sds011lib calls are synchronous, and each one blocks for its command wait time.
+        They run in a worker thread so the event loop can keep serving requests for the
+        duration of the warm-up/read cycle.
+        """
         try:
-            self.reader.wake()
+            await asyncio.to_thread(self.reader.wake)
             self.state = ReaderState(ReaderStatus.WARM_UP, None)
             await asyncio.sleep(self.warm_up_secs)
             self.state = ReaderState(ReaderStatus.READING, None)
-            pm25_reads = []
-            pm10_reads = []
+            # Only the averages are needed, so accumulate running sums instead of keeping the
+            # individual samples around.
+            pm25_sum = 0.0
+            pm10_sum = 0.0
             for x in range(0, self.iterations):
                 await asyncio.sleep(self.sleep_time)
-                result = self.reader.query()
-                pm25_reads.append(result.pm25)
-                pm10_reads.append(result.pm10)
-            self.reader.sleep()
+                result = await asyncio.to_thread(self.reader.query)
+                pm25_sum += result.pm25
+                pm10_sum += result.pm10
+            await asyncio.to_thread(self.reader.sleep)
             self.state = ReaderState(ReaderStatus.IDLE, None)
-            return AqiRead(pmtwofive=round(mean(pm25_reads), 2), pmten=round(mean(pm10_reads), 2))
+            return AqiRead(
+                pmtwofive=round(pm25_sum / self.iterations, 2),
+                pmten=round(pm10_sum / self.iterations, 2),
+            )
         except Exception as e:
             self.state = ReaderState(ReaderStatus.ERRORING, e)
-            self.reader.sleep()
+            await asyncio.to_thread(self.reader.sleep)
             raise e
 
     def get_state(self) -> ReaderState:
@@ -1,16 +1,18 @@
 """Core server module."""
-from fastapi import FastAPI, Depends
-from fastapi.responses import HTMLResponse
+import asyncio
+import time
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi_utils.tasks import repeat_every
 from starlette.responses import FileResponse
 import uvicorn
 import databases
 from pathlib import Path
 from datetime import datetime, timedelta
 from .database import (
-    get_all_reads,
-    get_all_epa_aqis,
+    get_read_points,
+    get_epa_points,
+    get_latest_event_time,
     get_latest_read,
     get_latest_epa_aqi,
     add_read,
@@ -18,35 +20,35 @@ from .database import (
     get_averaged_reads,
     create_tables,
     clean_old,
-    ReadLogEntry,
-    EpaAqiLogEntry,
 )
 from .read import AqiRead, Reader
 from .read.mock import MockReader
 from .read.novapm import OpinionatedReader
 from . import aqi_common
-from .config import Config, get_config_from_env
+from .config import get_config_from_env
 import logging
 from functools import lru_cache
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Dict, Optional, Tuple
 
 log = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 project_root = Path(__file__).parent.resolve()
 static_dir = project_root / "static"
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
-POLLUTANT_MAP = {aqi_common.Pollutant.PM_10: "PM10", aqi_common.Pollutant.PM_25: "PM25"}
-
 
 @dataclass
 class ScheduledReader:
-    """Simple state wrapper to track reader, and next schedule time."""
+    """Simple state wrapper to track reader, and next schedule time.
+
+    The schedule is stored as epoch milliseconds, precomputed when it's set so the status
+    endpoint serves it without any datetime arithmetic.
+    """
 
-    next_schedule: Optional[datetime]
+    next_schedule_ms: Optional[int]
     reader: Reader
 
 
@@ -59,16 +61,9 @@ def get_config():
     return get_config_from_env()
 
 
-@lru_cache(maxsize=1)
-def get_database(config: Config = Depends(get_config)) -> databases.Database:
-    """Retrieve database instance.
-
-    Creates a path to the database if it doesn't exist.
-
-    Uses LRU cache to simulate a singleton.
-    """
-    Path(config.database_path).parent.mkdir(parents=True, exist_ok=True)
-    return databases.Database(f"sqlite+aiosqlite:///{config.database_path}")
+def get_database(request: Request) -> databases.Database:
+    """Retrieve the database from the application state."""
+    return request.app.state.database
 
 
 def build_reader() -> ScheduledReader:
@@ -94,45 +89,61 @@ def build_reader() -> ScheduledReader:
         raise Exception("Invalid reader type specified")
 
 
-reader = build_reader()
-
-
-def get_reader() -> ScheduledReader:
-    """Retrieve the global reader to find state from.
-
-    TODO: Change this to not rely on global module-level state.
-    """
-    global reader
-    return reader
+def get_reader(request: Request) -> ScheduledReader:
+    """Retrieve the reader from the application state."""
+    return request.app.state.reader
 
 
 @app.on_event("startup")
 async def database_connect():
-    """Connect to the database, and create tables on startup."""
-    database = get_database(get_config_from_env())
+    """Create the database instance, connect, and create tables on startup.
+
+    Creates a path to the database if it doesn't exist.  The instance lives on the
+    application state so every handler and cron task shares one connection pool.
+    """
+    config = get_config()
+    Path(config.database_path).parent.mkdir(parents=True, exist_ok=True)
+    database = databases.Database(f"sqlite+aiosqlite:///{config.database_path}")
+    app.state.database = database
     await database.connect()
+    # Tune SQLite for the polling workload: WAL commits with a single fsync and lets the
+    # dashboard read while the cron task writes; NORMAL sync is durable enough under WAL.
+    await database.execute("PRAGMA journal_mode=WAL")
+    await database.execute("PRAGMA synchronous=NORMAL")
+    await database.execute("PRAGMA temp_store=MEMORY")
+    await database.execute("PRAGMA mmap_size=67108864")
     await create_tables(database)
 
 
 @app.on_event("shutdown")
 async def database_disconnect():
     """Disconnect from the database on shutdown."""
-    database = get_database(get_config_from_env())
-    await database.disconnect()
+    await app.state.database.disconnect()
+
+
+@app.on_event("startup")
+async def create_reader() -> None:
+    """Create the device reader on startup, and store it on the application state.
+
+    Building the reader opens the serial port and runs the wake/working-period handshake, so
+    it happens once at startup rather than at import time.
+    """
+    app.state.reader = build_reader()
 
 
 @app.on_event("startup")
 async def read_from_device() -> None:
     """Background cron task to read from the device."""
-    config = get_config_from_env()
-    database = get_database(config)
-    scheduled_reader = get_reader()
-
-    async def read_function() -> None:
-        try:
-            # Set the approximate time of the next read
-            result: AqiRead = await scheduled_reader.reader.read()
-            event_time = datetime.now()
+    config = get_config()
+    database = app.state.database
+    scheduled_reader: ScheduledReader = app.state.reader
+
+    async def read_cycle() -> None:
+        result: AqiRead = await scheduled_reader.reader.read()
+        event_time = datetime.now()
+        # Both writes for the cycle commit together, paying one fsync instead of two and
+        # never leaving a read without its matching EPA entry.
+        async with database.transaction():
             await add_read(
                 dbconn=database,
                 event_time=event_time,
@@ -144,76 +155,138 @@ async def read_from_device() -> None:
                 dbconn=database, lookback_to=event_time - timedelta(minutes=config.epa_lookback_minutes)
             )
             if averaged_reads:
-                read_list = [
+                read_list = (
                     aqi_common.PollutantReading(averaged_reads.avg_pm25, aqi_common.Pollutant.PM_25),
                     aqi_common.PollutantReading(averaged_reads.avg_pm10, aqi_common.Pollutant.PM_10),
-                ]
+                )
                 epa_aqi = aqi_common.calculate_epa_aqi(read_list)
 
                 if epa_aqi:
-                    pollutant = POLLUTANT_MAP.get(epa_aqi.responsible_pollutant)
-
-                    if pollutant is None:
-                        raise Exception(f"Invalid Pollutant! {epa_aqi.responsible_pollutant}")
-
                     await add_epa_read(
                         dbconn=database,
                         event_time=event_time,
                         epa_aqi=epa_aqi.reading,
-                        pollutant=pollutant,
+                        pollutant=epa_aqi.responsible_pollutant.value,
                         read_count=averaged_reads.count,
                         oldest_read_time=averaged_reads.oldest_read_time,
                     )
                 else:
                     log.warning("No EPA Value was calculated.")
 
-            await clean_old(dbconn=database, retention_minutes=config.retention_minutes)
-            scheduled_reader.next_schedule = datetime.now() + timedelta(seconds=config.poll_frequency_sec)
+    async def read_function() -> None:
+        try:
+            await read_cycle()
         except Exception as e:
+            # Deliberately broad: the reader signals simulated and device failures with bare
+            # Exception, and any escape here would kill the polling loop.
             log.exception("Failed to retrieve data from reader", e)
-            scheduled_reader.next_schedule = datetime.now() + timedelta(seconds=config.poll_frequency_sec)
+        finally:
+            # Set the approximate time of the next read
+            scheduled_reader.next_schedule_ms = (int(time.time()) + config.poll_frequency_sec) * 1000
 
-    # Note that we leverage the @repeat_every decorator here, but as a regular function call.  This allows us to
-    # use a non-global config object to specify the poll frequency
-    repeater = repeat_every(seconds=config.poll_frequency_sec)
-    await repeater(read_function)()
+    async def read_loop() -> None:
+        while True:
+            await read_function()
+            await asyncio.sleep(config.poll_frequency_sec)
 
+    # The task handle lives on app.state so it isn't garbage collected mid-flight, and so
+    # shutdown can cancel it.
+    app.state.read_task = asyncio.create_task(read_loop())
 
-def convert_all_to_view_dict(reads: List[ReadLogEntry], epas: List[EpaAqiLogEntry]):
-    """Convert data result to dictionary for view."""
-    view = {
-        "reads": [{"t": int(x.event_time.timestamp()), "pm25": x.pm25, "pm10": x.pm10} for x in reads],
-        "epas": [{"t": int(x.event_time.timestamp()), "epa": x.epa_aqi} for x in epas],
-    }
-    return view
+
+@app.on_event("startup")
+async def clean_database() -> None:
+    """Background cron task to prune expired rows.
+
+    This runs on its own schedule rather than piggybacking on the read cron, since retention
+    is measured in minutes and doesn't need checking on every read.  Hourly pruning is plenty
+    for the data rates involved; never prune more often than reads arrive.
+    """
+    config = get_config()
+    database = app.state.database
+    interval_sec = max(config.poll_frequency_sec, 3600)
+
+    async def clean_loop() -> None:
+        while True:
+            try:
+                await clean_old(dbconn=database, retention_minutes=config.retention_minutes)
+            except Exception as e:
+                log.exception("Failed to prune expired rows", e)
+            await asyncio.sleep(interval_sec)
+
+    app.state.clean_task = asyncio.create_task(clean_loop())
+
+
+@app.on_event("shutdown")
+async def stop_cron_tasks() -> None:
+    """Cancel the background cron tasks on shutdown."""
+    app.state.read_task.cancel()
+    app.state.clean_task.cancel()
 
 
 @app.get("/", response_class=HTMLResponse)
 async def home():
-    """Return the index page."""
-    return FileResponse(static_dir / "index.html")
+    """Return the index page.
+
+    The page only changes on deploy, so browsers may cache it briefly and revalidate with
+    the file's Last-Modified/ETag afterwards.
+    """
+    return FileResponse(static_dir / "index.html", headers={"Cache-Control": "public, max-age=300"})
+
+
+# Lookback per supported window.  Anything not listed here is rejected up front, so the
+# response cache below only ever holds one entry per window name.
+_WINDOW_DELTAS: Dict[str, Optional[timedelta]] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "all": None,
+}
+
+# Downsampling bucket width per window.  An hour of reads is small enough to chart raw;
+# longer windows are averaged server-side so the payload stays roughly chart-sized.
+_WINDOW_BUCKET_SECONDS = {"day": 600, "week": 3600, "all": 3600}
+
+# Memoized /api/sensor_data responses, keyed by window.  Entries are valid as long as no new
+# read has landed since they were built, which the latest event_time tells us cheaply.
+_sensor_data_cache: Dict[str, Tuple[Optional[int], dict]] = {}
 
 
 @app.get("/api/sensor_data")
 async def all_data(
+    request: Request,
+    response: Response,
     database: databases.Database = Depends(get_database),
     window: str = "all",
 ):
-    """Retrieve sensor data for the given window."""
-    window_delta = None
-    if window == "hour":
-        window_delta = timedelta(hours=1)
-    elif window == "day":
-        window_delta = timedelta(days=1)
-    elif window == "week":
-        window_delta = timedelta(weeks=1)
-    if window_delta:
-        all_reads = await get_all_reads(database, datetime.now() - window_delta)
-        all_epas = await get_all_epa_aqis(database, datetime.now() - window_delta)
-    else:
-        all_reads = await get_all_reads(database, None)
-        all_epas = await get_all_epa_aqis(database, None)
-    all_json = convert_all_to_view_dict(all_reads, all_epas)
+    """Retrieve sensor data for the given window.
+
+    Data only changes when a new read lands, so responses carry an ETag derived from the
+    latest read timestamp.  Clients that present it back get a 304, and identical requests
+    between reads are served from an in-process cache instead of re-querying the log.
+    """
+    if window not in _WINDOW_DELTAS:
+        raise HTTPException(status_code=400, detail=f"Unknown window: {window}")
+    latest_event_time = await get_latest_event_time(database)
+    etag = f'W/"{window}-{latest_event_time}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cached = _sensor_data_cache.get(window)
+    if cached is not None and cached[0] == latest_event_time:
+        response.headers["ETag"] = etag
+        return cached[1]
+
+    window_delta = _WINDOW_DELTAS[window]
+    lookback = datetime.now() - window_delta if window_delta else None
+    bucket_seconds = _WINDOW_BUCKET_SECONDS.get(window)
+    reads, epas = await asyncio.gather(
+        get_read_points(database, lookback, bucket_seconds),
+        get_epa_points(database, lookback, bucket_seconds),
+    )
+    all_json = {"reads": reads, "epas": epas}
+    _sensor_data_cache[window] = (latest_event_time, all_json)
+    response.headers["ETag"] = etag
     return all_json
 
 
@@ -222,8 +295,10 @@ async def latest_data(
     database: databases.Database = Depends(get_database),
 ):
     """Retrieve most recent reads."""
-    latest_reads = await get_latest_read(database)
-    latest_epa = await get_latest_epa_aqi(database)
+    latest_reads, latest_epa = await asyncio.gather(
+        get_latest_read(database),
+        get_latest_epa_aqi(database),
+    )
     return {
         "epa": latest_epa.epa_aqi,
         "level": aqi_common.get_epa_level(latest_epa.epa_aqi).name,
@@ -240,17 +315,17 @@ async def status(reader: ScheduledReader = Depends(get_reader)):
     return {
         "reader_status": str(reader.reader.get_state().status.name),
         "reader_exception": str(last_exception) if last_exception else None,
-        "next_schedule": int(reader.next_schedule.timestamp() * 1000) if reader.next_schedule else None,
+        "next_schedule": reader.next_schedule_ms,
     }
 
 
 def start():
     """Start the server."""
-    env_config = get_config_from_env()
+    env_config = get_config()
     uvicorn.run(app, host=env_config.server_host, port=env_config.server_port)
 
 
 def debug():
     """Start the server in debug mode, with hotswapping code."""
-    env_config = get_config_from_env()
+    env_config = get_config()
     uvicorn.run("aqimon.server:app", host=env_config.server_host, port=env_config.server_port, reload=True)
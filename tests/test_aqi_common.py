@@ -0,0 +1,71 @@
+import pytest
+
+from aqimon import aqi_common
+
+
+def test_calculate_epa_aqi_raw_low_bound():
+    reading = aqi_common.PollutantReading(0.0, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == 0
+
+
+def test_calculate_epa_aqi_raw_interpolates():
+    reading = aqi_common.PollutantReading(35.4, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == 100
+
+    reading = aqi_common.PollutantReading(154, aqi_common.Pollutant.PM_10)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == 100
+
+
+def test_calculate_epa_aqi_raw_mid_range():
+    reading = aqi_common.PollutantReading(45.0, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == 124
+
+
+def test_calculate_epa_aqi_raw_top_range():
+    reading = aqi_common.PollutantReading(350.5, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == 401
+
+    reading = aqi_common.PollutantReading(500.4, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == 500
+
+    reading = aqi_common.PollutantReading(604, aqi_common.Pollutant.PM_10)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == 500
+
+    # Beyond the top breakpoint is still out of range.
+    reading = aqi_common.PollutantReading(600.0, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == -1
+
+
+def test_calculate_epa_aqi_raw_out_of_range():
+    reading = aqi_common.PollutantReading(-1.0, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == -1
+
+    # Falls in the gap between two ranges.
+    reading = aqi_common.PollutantReading(12.05, aqi_common.Pollutant.PM_25)
+    assert aqi_common.calculate_epa_aqi_raw(reading) == -1
+
+
+def test_calculate_epa_aqi_reports_worst_pollutant():
+    readings = [
+        aqi_common.PollutantReading(10.0, aqi_common.Pollutant.PM_25),
+        aqi_common.PollutantReading(200, aqi_common.Pollutant.PM_10),
+    ]
+    result = aqi_common.calculate_epa_aqi(readings)
+    assert result.responsible_pollutant == aqi_common.Pollutant.PM_10
+    assert result.reading == 123
+
+
+def test_calculate_epa_aqi_empty():
+    assert aqi_common.calculate_epa_aqi([]) is None
+
+
+def test_get_epa_level():
+    assert aqi_common.get_epa_level(0) == aqi_common.EpaLevels.GOOD
+    assert aqi_common.get_epa_level(50) == aqi_common.EpaLevels.GOOD
+    assert aqi_common.get_epa_level(51) == aqi_common.EpaLevels.MODERATE
+    assert aqi_common.get_epa_level(500) == aqi_common.EpaLevels.HAZARDOUS
+
+
+def test_get_epa_level_invalid():
+    with pytest.raises(ValueError):
+        aqi_common.get_epa_level(501)
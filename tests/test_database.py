@@ -16,6 +16,37 @@ async def database_conn():
     await dbconn.disconnect()
 
 
+@pytest.mark.asyncio
+async def test_create_tables_migrates_legacy_schema():
+    dbconn = databases.Database("sqlite+aiosqlite://:memory:", force_rollback=True)
+    await dbconn.connect()
+    # Databases from the released version have rowid tables without a primary key, and an
+    # event_time index.
+    await dbconn.execute("CREATE TABLE read_log (event_time integer, pm25 real, pm10 real)")
+    await dbconn.execute("CREATE INDEX read_eventtime ON read_log (event_time)")
+    await dbconn.execute("INSERT INTO read_log VALUES (100, 1, 2)")
+    await dbconn.execute("INSERT INTO read_log VALUES (100, 3, 4)")
+    await dbconn.execute("INSERT INTO read_log VALUES (200, 5, 6)")
+
+    await database.create_tables(dbconn)
+
+    # Duplicate event_time rows collapse to the most recent insert.
+    result = await database.get_all_reads(dbconn, lookback=None)
+    assert len(result) == 2
+    assert result[0].event_time == datetime.fromtimestamp(100)
+    assert result[0].pm25 == 3.0
+    assert result[0].pm10 == 4.0
+
+    # The migrated table has the primary key, so same-second inserts replace.
+    await database.add_read(dbconn, datetime.fromtimestamp(200), pm10=8, pm25=7)
+    result = await database.get_all_reads(dbconn, lookback=None)
+    assert len(result) == 2
+    assert result[1].pm25 == 7.0
+    assert result[1].pm10 == 8.0
+
+    await dbconn.disconnect()
+
+
 @pytest.mark.asyncio
 async def test_get_latest_read(database_conn):
     current_time = datetime(2020, 1, 1, 12, 0, 0)
@@ -71,9 +102,14 @@ async def test_get_latest_epq_aqi_no_data(database_conn):
 @pytest.mark.asyncio
 async def test_get_all_reads(database_conn):
     current_time = datetime(2020, 1, 1, 12, 0, 0)
-    await database.add_read(database_conn, current_time - timedelta(hours=1), pm10=1, pm25=2)
-    await database.add_read(database_conn, current_time - timedelta(hours=2), pm10=2, pm25=3)
-    await database.add_read(database_conn, current_time - timedelta(hours=3), pm10=3, pm25=4)
+    await database.add_reads(
+        database_conn,
+        [
+            database.ReadLogEntry(current_time - timedelta(hours=1), pm10=1, pm25=2),
+            database.ReadLogEntry(current_time - timedelta(hours=2), pm10=2, pm25=3),
+            database.ReadLogEntry(current_time - timedelta(hours=3), pm10=3, pm25=4),
+        ],
+    )
 
     result = await database.get_all_reads(database_conn, lookback=None)
     assert len(result) == 3
@@ -89,9 +125,14 @@ async def test_get_all_reads(database_conn):
 @pytest.mark.asyncio
 async def test_get_all_reads_with_window(database_conn):
     current_time = datetime(2020, 1, 1, 12, 0, 0)
-    await database.add_read(database_conn, current_time - timedelta(hours=1), pm10=1, pm25=2)
-    await database.add_read(database_conn, current_time - timedelta(hours=2), pm10=2, pm25=3)
-    await database.add_read(database_conn, current_time - timedelta(hours=3), pm10=3, pm25=4)
+    await database.add_reads(
+        database_conn,
+        [
+            database.ReadLogEntry(current_time - timedelta(hours=1), pm10=1, pm25=2),
+            database.ReadLogEntry(current_time - timedelta(hours=2), pm10=2, pm25=3),
+            database.ReadLogEntry(current_time - timedelta(hours=3), pm10=3, pm25=4),
+        ],
+    )
 
     result = await database.get_all_reads(database_conn, current_time - timedelta(hours=2, minutes=30))
     assert len(result) == 2
@@ -107,29 +148,31 @@ async def test_get_all_reads_with_window(database_conn):
 @pytest.mark.asyncio
 async def test_get_all_epa_aqi(database_conn):
     current_time = datetime(2020, 1, 1, 12, 0, 0)
-    await database.add_epa_read(
-        database_conn,
-        current_time - timedelta(hours=1),
-        epa_aqi=2,
-        pollutant="PM25",
-        read_count=5,
-        oldest_read_time=current_time - timedelta(days=3),
-    )
-    await database.add_epa_read(
-        database_conn,
-        current_time - timedelta(hours=2),
-        epa_aqi=3,
-        pollutant="PM10",
-        read_count=20,
-        oldest_read_time=current_time - timedelta(days=60),
-    )
-    await database.add_epa_read(
+    await database.add_epa_reads(
         database_conn,
-        current_time - timedelta(hours=3),
-        epa_aqi=4,
-        pollutant="PM25",
-        read_count=10,
-        oldest_read_time=current_time - timedelta(days=30),
+        [
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=1),
+                epa_aqi=2,
+                pollutant="PM25",
+                read_count=5,
+                oldest_read_time=current_time - timedelta(days=3),
+            ),
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=2),
+                epa_aqi=3,
+                pollutant="PM10",
+                read_count=20,
+                oldest_read_time=current_time - timedelta(days=60),
+            ),
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=3),
+                epa_aqi=4,
+                pollutant="PM25",
+                read_count=10,
+                oldest_read_time=current_time - timedelta(days=30),
+            ),
+        ],
     )
 
     result = await database.get_all_epa_aqis(database_conn, lookback=None)
@@ -150,29 +193,31 @@ async def test_get_all_epa_aqi(database_conn):
 @pytest.mark.asyncio
 async def test_get_all_epa_aqi_with_window(database_conn):
     current_time = datetime(2020, 1, 1, 12, 0, 0)
-    await database.add_epa_read(
-        database_conn,
-        current_time - timedelta(hours=1),
-        epa_aqi=2,
-        pollutant="PM25",
-        read_count=5,
-        oldest_read_time=current_time - timedelta(days=3),
-    )
-    await database.add_epa_read(
+    await database.add_epa_reads(
         database_conn,
-        current_time - timedelta(hours=2),
-        epa_aqi=3,
-        pollutant="PM10",
-        read_count=20,
-        oldest_read_time=current_time - timedelta(days=60),
-    )
-    await database.add_epa_read(
-        database_conn,
-        current_time - timedelta(hours=3),
-        epa_aqi=4,
-        pollutant="PM25",
-        read_count=10,
-        oldest_read_time=current_time - timedelta(days=30),
+        [
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=1),
+                epa_aqi=2,
+                pollutant="PM25",
+                read_count=5,
+                oldest_read_time=current_time - timedelta(days=3),
+            ),
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=2),
+                epa_aqi=3,
+                pollutant="PM10",
+                read_count=20,
+                oldest_read_time=current_time - timedelta(days=60),
+            ),
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=3),
+                epa_aqi=4,
+                pollutant="PM25",
+                read_count=10,
+                oldest_read_time=current_time - timedelta(days=30),
+            ),
+        ],
     )
 
     result = await database.get_all_epa_aqis(database_conn, current_time - timedelta(hours=2, minutes=30))
@@ -190,15 +235,82 @@ async def test_get_all_epa_aqi_with_window(database_conn):
     assert result[0].event_time == current_time - timedelta(hours=2)
 
 
+@pytest.mark.asyncio
+async def test_get_bucketed_reads(database_conn):
+    current_time = datetime(2020, 1, 1, 12, 0, 0)
+    await database.add_reads(
+        database_conn,
+        [
+            database.ReadLogEntry(current_time, pm10=1, pm25=2),
+            database.ReadLogEntry(current_time + timedelta(minutes=5), pm10=3, pm25=4),
+            database.ReadLogEntry(current_time + timedelta(hours=1), pm10=5, pm25=6),
+        ],
+    )
+
+    result = await database.get_bucketed_reads(database_conn, lookback=None, bucket_seconds=3600)
+    assert len(result) == 2
+    assert result[0].event_time == current_time
+    assert result[0].pm10 == 2.0
+    assert result[0].pm25 == 3.0
+    assert result[1].event_time == current_time + timedelta(hours=1)
+    assert result[1].pm10 == 5.0
+    assert result[1].pm25 == 6.0
+
+
+@pytest.mark.asyncio
+async def test_get_bucketed_epa_aqis(database_conn):
+    current_time = datetime(2020, 1, 1, 12, 0, 0)
+    await database.add_epa_reads(
+        database_conn,
+        [
+            database.EpaAqiLogEntry(
+                event_time=current_time,
+                epa_aqi=2,
+                pollutant="PM25",
+                read_count=5,
+                oldest_read_time=current_time - timedelta(days=3),
+            ),
+            database.EpaAqiLogEntry(
+                event_time=current_time + timedelta(minutes=5),
+                epa_aqi=4,
+                pollutant="PM25",
+                read_count=5,
+                oldest_read_time=current_time - timedelta(days=3),
+            ),
+            database.EpaAqiLogEntry(
+                event_time=current_time + timedelta(hours=1),
+                epa_aqi=6,
+                pollutant="PM10",
+                read_count=10,
+                oldest_read_time=current_time - timedelta(days=3),
+            ),
+        ],
+    )
+
+    result = await database.get_bucketed_epa_aqis(database_conn, lookback=None, bucket_seconds=3600)
+    assert len(result) == 2
+    assert result[0].event_time == current_time
+    assert result[0].epa_aqi == 3.0
+    assert result[0].read_count == 10
+    assert result[1].event_time == current_time + timedelta(hours=1)
+    assert result[1].epa_aqi == 6.0
+    assert result[1].pollutant == "PM10"
+
+
 @pytest.mark.asyncio
 async def test_get_averaged_reads(database_conn):
     # Add reads every two hours
     current_time = datetime(2020, 1, 1, 12, 0, 0)
     lookback_to = current_time - timedelta(hours=8)
-    await database.add_read(database_conn, current_time - timedelta(hours=2), pm10=1, pm25=2)
-    await database.add_read(database_conn, current_time - timedelta(hours=4), pm10=2, pm25=3)
-    await database.add_read(database_conn, current_time - timedelta(hours=6), pm10=3, pm25=4)
-    await database.add_read(database_conn, current_time - timedelta(hours=8), pm10=4, pm25=5)
+    await database.add_reads(
+        database_conn,
+        [
+            database.ReadLogEntry(current_time - timedelta(hours=2), pm10=1, pm25=2),
+            database.ReadLogEntry(current_time - timedelta(hours=4), pm10=2, pm25=3),
+            database.ReadLogEntry(current_time - timedelta(hours=6), pm10=3, pm25=4),
+            database.ReadLogEntry(current_time - timedelta(hours=8), pm10=4, pm25=5),
+        ],
+    )
 
     result = await database.get_averaged_reads(database_conn, lookback_to)
     assert result.count == 4
@@ -212,9 +324,14 @@ async def test_get_averaged_reads_rounding(database_conn):
     # Add reads every two hours
     current_time = datetime(2020, 1, 1, 12, 0, 0)
     lookback_to = current_time - timedelta(hours=8)
-    await database.add_read(database_conn, current_time - timedelta(hours=2), pm10=2, pm25=2)
-    await database.add_read(database_conn, current_time - timedelta(hours=4), pm10=4, pm25=3)
-    await database.add_read(database_conn, current_time - timedelta(hours=6), pm10=4, pm25=3)
+    await database.add_reads(
+        database_conn,
+        [
+            database.ReadLogEntry(current_time - timedelta(hours=2), pm10=2, pm25=2),
+            database.ReadLogEntry(current_time - timedelta(hours=4), pm10=4, pm25=3),
+            database.ReadLogEntry(current_time - timedelta(hours=6), pm10=4, pm25=3),
+        ],
+    )
 
     result = await database.get_averaged_reads(database_conn, lookback_to)
     assert result.count == 3
@@ -242,7 +359,9 @@ async def test_get_averaged_reads_looks_past(database_conn):
 
 @pytest.mark.asyncio
 async def test_clean_old(database_conn):
-    current_time = datetime.now()
+    # Truncate up front: storage keeps whole epoch seconds, so comparisons need no
+    # per-assertion adjustment.
+    current_time = datetime.now().replace(microsecond=0)
     await database.add_read(database_conn, current_time - timedelta(hours=2), pm10=1, pm25=2)
     await database.add_read(database_conn, current_time - timedelta(hours=4), pm10=2, pm25=3)
 
@@ -288,31 +407,94 @@ async def test_clean_old(database_conn):
 
     result = await database.get_all_reads(database_conn, lookback=None)
     assert len(result) == 2
-    assert result[0].event_time == (current_time - timedelta(hours=4)).replace(microsecond=0)
-    assert result[1].event_time == (current_time - timedelta(hours=2)).replace(microsecond=0)
+    assert result[0].event_time == current_time - timedelta(hours=4)
+    assert result[1].event_time == current_time - timedelta(hours=2)
 
     result2 = await database.get_all_epa_aqis(database_conn, lookback=None)
     assert len(result2) == 2
-    assert result2[0].event_time == (current_time - timedelta(hours=4)).replace(microsecond=0)
-    assert result2[1].event_time == (current_time - timedelta(hours=2)).replace(microsecond=0)
+    assert result2[0].event_time == current_time - timedelta(hours=4)
+    assert result2[1].event_time == current_time - timedelta(hours=2)
 
 
 @pytest.mark.asyncio
 async def test_add_read(database_conn):
-    current_time = datetime.now()
+    current_time = datetime(2020, 1, 1, 12, 0, 0)
 
     await database.add_read(database_conn, current_time - timedelta(hours=2), pm10=1, pm25=2)
     await database.add_read(database_conn, current_time - timedelta(hours=4), pm10=2, pm25=3)
 
     result = await database.get_all_reads(database_conn, lookback=None)
     assert len(result) == 2
-    assert result[0].event_time == (current_time - timedelta(hours=4)).replace(microsecond=0)
-    assert result[1].event_time == (current_time - timedelta(hours=2)).replace(microsecond=0)
+    assert result[0].event_time == current_time - timedelta(hours=4)
+    assert result[1].event_time == current_time - timedelta(hours=2)
+
+
+@pytest.mark.asyncio
+async def test_add_read_same_second_replaces(database_conn):
+    current_time = datetime(2020, 1, 1, 12, 0, 0)
+
+    await database.add_read(database_conn, current_time, pm10=1, pm25=2)
+    await database.add_read(database_conn, current_time, pm10=3, pm25=4)
+
+    result = await database.get_all_reads(database_conn, lookback=None)
+    assert len(result) == 1
+    assert result[0].pm10 == 3.0
+    assert result[0].pm25 == 4.0
+
+
+@pytest.mark.asyncio
+async def test_add_reads_bulk(database_conn):
+    current_time = datetime(2020, 1, 1, 12, 0, 0)
+
+    await database.add_reads(
+        database_conn,
+        [
+            database.ReadLogEntry(current_time - timedelta(hours=4), pm10=2, pm25=3),
+            database.ReadLogEntry(current_time - timedelta(hours=2), pm10=1, pm25=2),
+        ],
+    )
+
+    result = await database.get_all_reads(database_conn, lookback=None)
+    assert len(result) == 2
+    assert result[0].event_time == current_time - timedelta(hours=4)
+    assert result[1].event_time == current_time - timedelta(hours=2)
+
+
+@pytest.mark.asyncio
+async def test_add_epa_reads_bulk(database_conn):
+    current_time = datetime(2020, 1, 1, 12, 0, 0)
+
+    await database.add_epa_reads(
+        database_conn,
+        [
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=4),
+                epa_aqi=3,
+                pollutant="PM10",
+                read_count=20,
+                oldest_read_time=current_time - timedelta(days=60),
+            ),
+            database.EpaAqiLogEntry(
+                event_time=current_time - timedelta(hours=2),
+                epa_aqi=2,
+                pollutant="PM25",
+                read_count=5,
+                oldest_read_time=current_time - timedelta(days=3),
+            ),
+        ],
+    )
+
+    result = await database.get_all_epa_aqis(database_conn, lookback=None)
+    assert len(result) == 2
+    assert result[0].epa_aqi == 3.0
+    assert result[0].pollutant == "PM10"
+    assert result[1].epa_aqi == 2.0
+    assert result[1].pollutant == "PM25"
 
 
 @pytest.mark.asyncio
 async def test_add_epa_read(database_conn):
-    current_time = datetime.now()
+    current_time = datetime(2020, 1, 1, 12, 0, 0)
 
     await database.add_epa_read(
         database_conn,
@@ -333,5 +515,5 @@ async def test_add_epa_read(database_conn):
 
     result = await database.get_all_epa_aqis(database_conn, lookback=None)
     assert len(result) == 2
-    assert result[0].event_time == (current_time - timedelta(hours=4)).replace(microsecond=0)
-    assert result[1].event_time == (current_time - timedelta(hours=2)).replace(microsecond=0)
+    assert result[0].event_time == current_time - timedelta(hours=4)
+    assert result[1].event_time == current_time - timedelta(hours=2)